@@ -14,10 +14,11 @@ Features:
 Note: Pylance may show false positives for static method references in flag_mapping
 """
 
+import atexit
 import json
 import os
 import re
-import subprocess
+import string
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -28,21 +29,50 @@ ENABLE_LOGGING = True
 LOG_DIR = Path.home() / ".claude" / "logs"
 ENGINEER_NAME = os.environ.get("USER", "Engineer")
 
+# English month names; avoids strftime's locale-aware formatting
+_MONTHS = (
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+)
+
+# Serialized log lines waiting to be written by _flush_logs
+_LOG_BUFFER: List[bytes] = []
+
+# Characters allowed in a flag name: -flag_name
+_FLAG_CHARS = frozenset(string.ascii_letters + "_")
+
+# Flags that suppress the auto-applied engineering standards
+_HELP_FLAGS = frozenset({"hh", "hhelp"})
+_STANDARDS_FLAGS = frozenset({"e", "eng", "standards"})
+
+# Patterns compiled once per process
+# Simple queries that skip default contexts: shell-style commands and short
+# questions, "show me ..." requests, questions starting with ?, and greetings
+_SKIP_RE = re.compile(
+    r"^(?:(?:ls|dir|pwd|cd|cat|grep|find|which|what|where|who|when|how much|how many)\b"
+    r"|(?:show|list|display|get|fetch)\s+"
+    r"|\?"
+    r"|(?:hi|hello|hey|thanks|thank you|bye))"
+)
+
 
 class PromptEnhancer:
     def __init__(self) -> None:
         self.contexts: List[str] = []
+        # Read the clock once; reused for the current-date context
+        self.now: datetime = datetime.now()
         self.log_data: Dict[str, Any] = {
-            "timestamp": datetime.now().isoformat(),
-            "formatted_date": datetime.now()
-            .strftime("%B {}, %Y")
-            .format(datetime.now().day),
+            "timestamp": self.now.isoformat(),
+            "formatted_date": f"{_MONTHS[self.now.month - 1]} {self.now.day}, {self.now.year}",
         }
 
     def add_context(self, context: str) -> None:
         """Add context that will be injected into the prompt"""
-        if context and context.strip():
-            self.contexts.append(context.strip())
+        if not context:
+            return
+        context = context.strip()
+        if context:
+            self.contexts.append(context)
 
     def log_event(self, key: str, value: Any) -> None:
         """Add data to be logged"""
@@ -247,127 +277,175 @@ Note: Engineering standards (-e) are auto-applied for substantial work unless yo
 class ContextInjectors:
     """Context injectors that add project information"""
 
+    @staticmethod
+    def get_git_branch() -> str:
+        """Get current git branch, reading .git/HEAD directly when possible"""
+        try:
+            cwd = Path.cwd()
+            for directory in (cwd, *cwd.parents):
+                git_path = directory / ".git"
+                if git_path.is_dir():
+                    head = (git_path / "HEAD").read_text().strip()
+                    # Reftable repositories keep a stub HEAD; let git resolve it
+                    if head == "ref: refs/heads/.invalid":
+                        break
+                    # Detached HEAD has no branch, same as `git branch --show-current`
+                    if head.startswith("ref: refs/heads/"):
+                        return head[16:]
+                    return ""
+                if git_path.is_file():
+                    # Worktree or submodule: HEAD lives elsewhere, let git resolve it
+                    break
+            else:
+                return ""  # Not inside a repository; skip spawning git
+        except OSError:
+            return ""  # e.g. the working directory was deleted
+
+        import subprocess  # Imported lazily; only needed here
+
+        # Branch names are short; read a bounded chunk instead of check_output
+        try:
+            with subprocess.Popen(
+                ["git", "branch", "--show-current"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            ) as proc:
+                return proc.stdout.read(256).decode().strip()
+        except (FileNotFoundError, OSError):
+            return ""
+
     @staticmethod
     def get_git_info() -> str:
         """Get current git branch and status"""
-        try:
-            branch = (
-                subprocess.check_output(
-                    ["git", "branch", "--show-current"], stderr=subprocess.DEVNULL
-                )
-                .decode()
-                .strip()
-            )
-            if branch:
-                return f"\n[Git Branch: {branch}]"
-        except (subprocess.CalledProcessError, FileNotFoundError, OSError):
-            pass
+        branch = ContextInjectors.get_git_branch()
+        if branch:
+            return f"\n[Git Branch: {branch}]"
         return ""
 
     @staticmethod
-    def get_current_date() -> str:
+    def get_current_date(now: Optional[datetime] = None) -> str:
         """Add current date context to help Claude recognize when to search for updates"""
         # Format: "August 4, 2025" - helps Claude recognize time gap from Jan 2025 cutoff
-        return f"\n[Current Date: {datetime.now().strftime('%B {}, %Y').format(datetime.now().day)}]"
+        if now is None:
+            now = datetime.now()
+        return f"\n[Current Date: {_MONTHS[now.month - 1]} {now.day}, {now.year}]"
 
 
 def parse_flags(prompt: str) -> Tuple[str, List[str]]:
     """Parse flags from the end of the prompt"""
-    # Pattern matches flags at the end: -flag1 -flag2
-    # Made more flexible to handle flags at start or with no preceding space
-    flags_pattern = r"((?:^|\s+)-[a-zA-Z_]+)+$"
-    match = re.search(flags_pattern, prompt)
-
-    if match:
-        flags_str = match.group(0)
-        clean_prompt = prompt[: match.start()].rstrip()
-        flags = re.findall(r"-([a-zA-Z_]+)", flags_str)
-        return clean_prompt, flags
+    # Walk whitespace-delimited tokens from the end: ... -flag1 -flag2
+    flags: List[str] = []
+    rest = prompt.rstrip()
+    while rest:
+        parts = rest.rsplit(None, 1)
+        token = parts[-1]
+        if len(token) < 2 or token[0] != "-" or not _FLAG_CHARS.issuperset(token[1:]):
+            break
+        flags.append(token[1:])
+        rest = parts[0] if len(parts) == 2 else ""
+
+    if flags:
+        flags.reverse()
+        return rest, flags
 
     return prompt, []
 
 
+# Flag name -> handler, built once at import
+_FLAG_HANDLERS: Dict[str, Callable[[], str]] = {
+    # Thinking modes
+    "u": FlagHandlers.ultrathink,
+    "ultrathink": FlagHandlers.ultrathink,
+    "th": FlagHandlers.think_hard,
+    "think_hard": FlagHandlers.think_hard,
+    "t": FlagHandlers.think,
+    "think": FlagHandlers.think,
+    # Quality modes
+    "e": FlagHandlers.engineering_standards,
+    "eng": FlagHandlers.engineering_standards,
+    "standards": FlagHandlers.engineering_standards,
+    "clean": FlagHandlers.clean,
+    # Development modes
+    "p": FlagHandlers.plan,
+    "plan": FlagHandlers.plan,
+    "v": FlagHandlers.verbose,
+    "verbose": FlagHandlers.verbose,
+    "s": FlagHandlers.security,
+    "sec": FlagHandlers.security,
+    "test": FlagHandlers.test,
+    "doc": FlagHandlers.doc,
+    "perf": FlagHandlers.perf,
+    "review": FlagHandlers.review,
+    "refactor": FlagHandlers.refactor,
+    "debug": FlagHandlers.debug,
+    "api": FlagHandlers.api,
+    "no_guess": FlagHandlers.no_guess,
+    "ng": FlagHandlers.no_guess,
+    # Context
+    "ctx": FlagHandlers.context,
+    "context": FlagHandlers.context,
+    # Help
+    "hh": FlagHandlers.help,
+    "hhelp": FlagHandlers.help,
+}
+
+
 def get_flag_handler(flag: str) -> Optional[Callable[[], str]]:
     """Get the appropriate handler for a flag"""
-    flag_mapping = {
-        # Thinking modes
-        "u": FlagHandlers.ultrathink,
-        "ultrathink": FlagHandlers.ultrathink,
-        "th": FlagHandlers.think_hard,
-        "think_hard": FlagHandlers.think_hard,
-        "t": FlagHandlers.think,
-        "think": FlagHandlers.think,
-        # Quality modes
-        "e": FlagHandlers.engineering_standards,
-        "eng": FlagHandlers.engineering_standards,
-        "standards": FlagHandlers.engineering_standards,
-        "clean": FlagHandlers.clean,
-        # Development modes
-        "p": FlagHandlers.plan,
-        "plan": FlagHandlers.plan,
-        "v": FlagHandlers.verbose,
-        "verbose": FlagHandlers.verbose,
-        "s": FlagHandlers.security,
-        "sec": FlagHandlers.security,
-        "test": FlagHandlers.test,
-        "doc": FlagHandlers.doc,
-        "perf": FlagHandlers.perf,
-        "review": FlagHandlers.review,
-        "refactor": FlagHandlers.refactor,
-        "debug": FlagHandlers.debug,
-        "api": FlagHandlers.api,
-        "no_guess": FlagHandlers.no_guess,
-        "ng": FlagHandlers.no_guess,
-        # Context
-        "ctx": FlagHandlers.context,
-        "context": FlagHandlers.context,
-        # Help
-        "hh": FlagHandlers.help,
-        "hhelp": FlagHandlers.help,
-    }
-
-    return flag_mapping.get(flag.lower())
+    return _FLAG_HANDLERS.get(flag.lower())
 
 
 def should_apply_defaults(prompt: str, flags: List[str]) -> bool:
     """Determine if default contexts should be applied"""
-    # Skip defaults for simple queries
-    skip_patterns = [
-        r"^(ls|dir|pwd|cd|cat|grep|find|which|what|where|who|when|how much|how many)\b",
-        r"^(show|list|display|get|fetch)\s+(me\s+)?(the\s+)?",
-        r"^\?",  # Questions starting with ?
-        r"^(hi|hello|hey|thanks|thank you|bye)",  # Greetings
-    ]
-
-    prompt_lower = prompt.lower()
-    for pattern in skip_patterns:
-        if re.match(pattern, prompt_lower):
-            return False
+    # Skip defaults for simple queries; the patterns only inspect a short
+    # prefix, so avoid lowercasing the whole prompt
+    if _SKIP_RE.match(prompt[:32].lower()):
+        return False
 
     # Apply defaults for substantial work
     return True
 
 
-def write_log(enhancer: PromptEnhancer) -> None:
-    """Write log entry if logging is enabled"""
-    if not ENABLE_LOGGING:
+def _dumps(obj: Any) -> bytes:
+    """Serialize obj to JSON bytes"""
+    return json.dumps(obj).encode()
+
+
+def _flush_logs() -> None:
+    """Append all buffered log entries in a single write"""
+    if not _LOG_BUFFER:
         return
 
     try:
         LOG_DIR.mkdir(parents=True, exist_ok=True)
         log_file = LOG_DIR / "prompt_hooks.jsonl"
 
-        with open(log_file, "a") as f:
-            json.dump(enhancer.log_data, f)
-            f.write("\n")
+        with open(log_file, "ab") as f:
+            f.write(b"".join(_LOG_BUFFER))
     except (IOError, OSError, PermissionError):
         pass  # Silently fail logging
+    finally:
+        _LOG_BUFFER.clear()
+
+
+atexit.register(_flush_logs)
+
+
+def write_log(enhancer: PromptEnhancer) -> None:
+    """Queue log entry if logging is enabled; flushed once at exit"""
+    if not ENABLE_LOGGING:
+        return
+
+    try:
+        _LOG_BUFFER.append(_dumps(enhancer.log_data) + b"\n")
+    except (TypeError, ValueError):
+        pass  # Silently fail logging
 
 
 def main() -> None:
     try:
-        # Read input
-        input_data = json.load(sys.stdin)
+        # Read input in a single read and parse it from bytes
+        input_data = json.loads(sys.stdin.buffer.read())
         prompt: str = input_data.get("prompt", "")
         session_id: str = input_data.get("session_id", "unknown")
 
@@ -376,30 +454,37 @@ def main() -> None:
         enhancer.log_event("original_prompt", prompt)
         enhancer.log_event("session_id", session_id)
 
+        # Nothing to enhance for a blank prompt; skip context gathering
+        if not prompt.strip():
+            enhancer.log_event("empty_prompt", True)
+            write_log(enhancer)
+            sys.exit(0)
+
         # Parse flags
         clean_prompt, flags = parse_flags(prompt)
         enhancer.log_event("flags", flags)
         enhancer.log_event("clean_prompt", clean_prompt)
+        flags_set = {flag.lower() for flag in flags}
+        is_help = not flags_set.isdisjoint(_HELP_FLAGS)
 
         # Special handling for help flag alone
-        if clean_prompt.strip() == "" and ("hh" in flags or "hhelp" in flags):
+        if clean_prompt.strip() == "" and is_help:
             # If only -h flag, make it clear this is a help request
             clean_prompt = "Show available hook flags"
             enhancer.log_event("help_request", True)
 
         # Add minimal but useful context injections
-        enhancer.add_context(ContextInjectors.get_current_date())
+        enhancer.add_context(ContextInjectors.get_current_date(enhancer.now))
         git_info: str = ContextInjectors.get_git_info()
         if git_info:
             enhancer.add_context(git_info)
 
         # Apply default engineering standards if appropriate
         # Skip defaults if asking for help or for simple queries
-        if "hh" not in flags and "hhelp" not in flags:
+        if not is_help:
             if (
                 should_apply_defaults(clean_prompt, flags)
-                and "e" not in flags
-                and "eng" not in flags
+                and flags_set.isdisjoint(_STANDARDS_FLAGS)
             ):
                 # Auto-apply engineering standards for substantial work
                 enhancer.add_context(FlagHandlers.engineering_standards())
@@ -417,7 +502,8 @@ def main() -> None:
 
         # Output combined context
         if enhancer.contexts:
-            output: str = "\n".join(enhancer.contexts)
+            contexts = enhancer.contexts
+            output: str = contexts[0] if len(contexts) == 1 else "\n".join(contexts)
             print(output)
             enhancer.log_event("injected_context", output)
 
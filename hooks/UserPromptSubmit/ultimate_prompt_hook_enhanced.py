@@ -9,43 +9,69 @@ Enhanced features:
 - Additional BMad-specific flags
 """
 
+import atexit
+import functools
 import json
 import os
 import re
-import subprocess
+import string
 import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
+
+# Cached filesystem probes, keyed on absolute path so a chdir between calls
+# never returns another directory's result
+def _exists(path: str) -> bool:
+    """Path.exists() memoized per absolute path"""
+    try:
+        return _exists_abs(os.path.abspath(path))
+    except OSError:
+        return False  # Working directory no longer exists
+
+
+def _count_markdown(directory: str) -> int:
+    """Count of *.md files in a directory, memoized per absolute path"""
+    try:
+        return _count_markdown_abs(os.path.abspath(directory))
+    except OSError:
+        return 0
+
+
+@functools.lru_cache(maxsize=64)
+def _exists_abs(path: str) -> bool:
+    return Path(path).exists()
+
+
+@functools.lru_cache(maxsize=16)
+def _count_markdown_abs(directory: str) -> int:
+    return sum(1 for _ in Path(directory).glob("*.md"))
+
+
 # Import base functionality from original hook
-# This allows using the original hook as a base while adding enhancements
+# This allows using the original hook as a base while adding enhancements.
+# A plain import lets Python reuse the cached bytecode in __pycache__.
 try:
-    import importlib.util
-    import sys
-    
-    # Try to load the original hook module
-    hook_path = Path(__file__).parent / "ultimate-prompt-hook.py"
-    if hook_path.exists():
-        spec = importlib.util.spec_from_file_location("ultimate_prompt_hook", hook_path)
-        ultimate_prompt_hook = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(ultimate_prompt_hook)
-        
-        # Import classes and functions
-        BaseFlagHandlers = ultimate_prompt_hook.FlagHandlers
-        ContextInjectors = ultimate_prompt_hook.ContextInjectors
-        PromptEnhancer = ultimate_prompt_hook.PromptEnhancer
-        parse_flags = ultimate_prompt_hook.parse_flags
-        should_apply_defaults = ultimate_prompt_hook.should_apply_defaults
-        write_log = ultimate_prompt_hook.write_log
-        ENABLE_LOGGING = ultimate_prompt_hook.ENABLE_LOGGING
-        LOG_DIR = ultimate_prompt_hook.LOG_DIR
-        ENGINEER_NAME = ultimate_prompt_hook.ENGINEER_NAME
-        
-        USE_BASE_HANDLERS = True
-    else:
-        raise ImportError("Original hook file not found")
-        
+    import ultimate_prompt_hook
+
+    # Import classes and functions
+    BaseFlagHandlers = ultimate_prompt_hook.FlagHandlers
+    ContextInjectors = ultimate_prompt_hook.ContextInjectors
+    get_git_branch = ContextInjectors.get_git_branch
+    PromptEnhancer = ultimate_prompt_hook.PromptEnhancer
+    parse_flags = ultimate_prompt_hook.parse_flags
+    should_apply_defaults = ultimate_prompt_hook.should_apply_defaults
+    write_log = ultimate_prompt_hook.write_log
+    ENABLE_LOGGING = ultimate_prompt_hook.ENABLE_LOGGING
+    LOG_DIR = ultimate_prompt_hook.LOG_DIR
+    ENGINEER_NAME = ultimate_prompt_hook.ENGINEER_NAME
+    _MONTHS = ultimate_prompt_hook._MONTHS
+    _HELP_FLAGS = ultimate_prompt_hook._HELP_FLAGS
+    _STANDARDS_FLAGS = ultimate_prompt_hook._STANDARDS_FLAGS
+
+    USE_BASE_HANDLERS = True
+
 except (ImportError, AttributeError):
     # Fallback if original hook is not available
     USE_BASE_HANDLERS = False
@@ -72,14 +98,8 @@ A successful solution must:
 Don't write or change any code until you're at least 95% confident in what needs to be done. If anything is unclear, ask for more information.
 """
 
-# Enhanced Flag Handlers (extends base handlers)
-class EnhancedFlagHandlers:
-    """Enhanced flag handlers with BMad integration"""
-    
-    @staticmethod
-    def engineering_standards() -> str:
-        """Enhanced engineering standards with anti-wrapper rule"""
-        base_standards = """
+# Composed once at import; handlers return these directly
+ENHANCED_ENGINEERING_STANDARDS = """
 Follow the project's principal engineering standards. No shortcuts, stubs, or hardcoded values. We build it right the first time: clean, robust, and production ready. No halfway measures.
 
 Keep it tight. Use the simplest solution that meets the need with high quality. Do not overengineer. Do not create new files, layers, or abstractions unless they are clearly necessary. Every line of code should earn its place. Simplicity is earned through understanding, not guesswork.
@@ -87,13 +107,26 @@ Keep it tight. Use the simplest solution that meets the need with high quality.
 Make it clean. Make it count.
 
 If you encounter uncertainty, lack context, or are not confident in the solution, stop. Do not guess or make things up. It is not only okay, it is expected, to ask for clarification or help. Excellence includes knowing when to pause.
-"""
-        return base_standards + ANTI_WRAPPER_RULE
+""" + ANTI_WRAPPER_RULE
+
+ENHANCED_NO_GUESS = (
+    "\n\nDo not guess or make assumptions. If something is unclear or you lack necessary context, stop and ask for clarification. It's better to ask than to implement incorrectly."
+    + ANTI_WRAPPER_RULE
+)
+
+# Enhanced Flag Handlers (extends base handlers)
+class EnhancedFlagHandlers:
+    """Enhanced flag handlers with BMad integration"""
+    
+    @staticmethod
+    def engineering_standards() -> str:
+        """Enhanced engineering standards with anti-wrapper rule"""
+        return ENHANCED_ENGINEERING_STANDARDS
 
     @staticmethod
     def no_guess() -> str:
         """Enhanced no guess mode with anti-wrapper rule"""
-        return f"\n\nDo not guess or make assumptions. If something is unclear or you lack necessary context, stop and ask for clarification. It's better to ask than to implement incorrectly.{ANTI_WRAPPER_RULE}"
+        return ENHANCED_NO_GUESS
 
     @staticmethod
     def bmad() -> str:
@@ -101,29 +134,25 @@ If you encounter uncertainty, lack context, or are not confident in the solution
         bmad_context = ""
         
         # Check if BMad is installed
-        if Path("bmad-core").exists():
+        if _exists("bmad-core"):
             bmad_context += "\n\n[BMad Method Active]"
             
             # Load technical preferences if available
-            tech_prefs = Path("bmad-core/data/technical-preferences.md")
-            if tech_prefs.exists():
+            if _exists("bmad-core/data/technical-preferences.md"):
                 bmad_context += "\nReference technical preferences from bmad-core/data/technical-preferences.md"
             
             # Check current stories
-            stories_dir = Path("docs/stories")
-            if stories_dir.exists():
-                stories = list(stories_dir.glob("*.md"))
-                if stories:
-                    bmad_context += f"\nActive stories available in docs/stories/ ({len(stories)} stories)"
+            if _exists("docs/stories"):
+                story_count = _count_markdown("docs/stories")
+                if story_count:
+                    bmad_context += f"\nActive stories available in docs/stories/ ({story_count} stories)"
             
             # Check for architecture docs
-            arch_docs = Path("docs/architecture")
-            if arch_docs.exists():
+            if _exists("docs/architecture"):
                 bmad_context += "\nArchitecture documentation available in docs/architecture/"
             
             # Check for PRD
-            prd_file = Path("docs/prd.md")
-            if prd_file.exists():
+            if _exists("docs/prd.md"):
                 bmad_context += "\nPRD available in docs/prd.md"
             
             bmad_context += "\nApply BMad workflow patterns and engineering standards."
@@ -191,113 +220,177 @@ Note: Engineering standards include anti-wrapper rule enforcement. BMad flags on
         
         return base_help
 
+# Flag name -> handler mappings, built once at import
+_ENHANCED_HANDLERS: Dict[str, Callable[[], str]] = {
+    # Enhanced versions
+    "e": EnhancedFlagHandlers.engineering_standards,
+    "eng": EnhancedFlagHandlers.engineering_standards,
+    "standards": EnhancedFlagHandlers.engineering_standards,
+    "no_guess": EnhancedFlagHandlers.no_guess,
+    "ng": EnhancedFlagHandlers.no_guess,
+    # BMad specific
+    "bmad": EnhancedFlagHandlers.bmad,
+    "bmad_story": EnhancedFlagHandlers.bmad_story,
+    "bmad_review": EnhancedFlagHandlers.bmad_review,
+    # Enhanced help
+    "hh": EnhancedFlagHandlers.help,
+    "hhelp": EnhancedFlagHandlers.help,
+}
+
+_BASE_HANDLERS: Dict[str, Callable[[], str]] = {}
+if USE_BASE_HANDLERS:
+    _BASE_HANDLERS = {
+        "u": BaseFlagHandlers.ultrathink,
+        "ultrathink": BaseFlagHandlers.ultrathink,
+        "th": BaseFlagHandlers.think_hard,
+        "think_hard": BaseFlagHandlers.think_hard,
+        "t": BaseFlagHandlers.think,
+        "think": BaseFlagHandlers.think,
+        "clean": BaseFlagHandlers.clean,
+        "p": BaseFlagHandlers.plan,
+        "plan": BaseFlagHandlers.plan,
+        "v": BaseFlagHandlers.verbose,
+        "verbose": BaseFlagHandlers.verbose,
+        "s": BaseFlagHandlers.security,
+        "sec": BaseFlagHandlers.security,
+        "security": BaseFlagHandlers.security,
+        "test": BaseFlagHandlers.test,
+        "doc": BaseFlagHandlers.doc,
+        "perf": BaseFlagHandlers.perf,
+        "review": BaseFlagHandlers.review,
+        "refactor": BaseFlagHandlers.refactor,
+        "debug": BaseFlagHandlers.debug,
+        "api": BaseFlagHandlers.api,
+        "ctx": BaseFlagHandlers.context,
+        "context": BaseFlagHandlers.context,
+    }
+
+# Single lookup table; enhanced handlers override base ones for shared flags
+_ALL_HANDLERS: Dict[str, Callable[[], str]] = {**_BASE_HANDLERS, **_ENHANCED_HANDLERS}
+
 def get_enhanced_flag_handler(flag: str) -> Optional[Callable[[], str]]:
     """Get enhanced flag handler, fallback to base handlers"""
-    enhanced_mapping = {
-        # Enhanced versions
-        "e": EnhancedFlagHandlers.engineering_standards,
-        "eng": EnhancedFlagHandlers.engineering_standards,
-        "standards": EnhancedFlagHandlers.engineering_standards,
-        "no_guess": EnhancedFlagHandlers.no_guess,
-        "ng": EnhancedFlagHandlers.no_guess,
-        # BMad specific
-        "bmad": EnhancedFlagHandlers.bmad,
-        "bmad_story": EnhancedFlagHandlers.bmad_story,
-        "bmad_review": EnhancedFlagHandlers.bmad_review,
-        # Enhanced help
-        "hh": EnhancedFlagHandlers.help,
-        "hhelp": EnhancedFlagHandlers.help,
-    }
-    
-    # Check enhanced handlers first
-    if flag.lower() in enhanced_mapping:
-        return enhanced_mapping[flag.lower()]
-    
-    # Fall back to base handlers if available
-    if USE_BASE_HANDLERS:
-        base_mapping = {
-            "u": BaseFlagHandlers.ultrathink,
-            "ultrathink": BaseFlagHandlers.ultrathink,
-            "th": BaseFlagHandlers.think_hard,
-            "think_hard": BaseFlagHandlers.think_hard,
-            "t": BaseFlagHandlers.think,
-            "think": BaseFlagHandlers.think,
-            "clean": BaseFlagHandlers.clean,
-            "p": BaseFlagHandlers.plan,
-            "plan": BaseFlagHandlers.plan,
-            "v": BaseFlagHandlers.verbose,
-            "verbose": BaseFlagHandlers.verbose,
-            "s": BaseFlagHandlers.security,
-            "sec": BaseFlagHandlers.security,
-            "security": BaseFlagHandlers.security,
-            "test": BaseFlagHandlers.test,
-            "doc": BaseFlagHandlers.doc,
-            "perf": BaseFlagHandlers.perf,
-            "review": BaseFlagHandlers.review,
-            "refactor": BaseFlagHandlers.refactor,
-            "debug": BaseFlagHandlers.debug,
-            "api": BaseFlagHandlers.api,
-            "ctx": BaseFlagHandlers.context,
-            "context": BaseFlagHandlers.context,
-        }
-        return base_mapping.get(flag.lower())
-    
-    return None
+    return _ALL_HANDLERS.get(flag.lower())
 
 # Fallback implementations if base handlers not available
 if not USE_BASE_HANDLERS:
+    # English month names; avoids strftime's locale-aware formatting
+    _MONTHS = (
+        "January", "February", "March", "April", "May", "June",
+        "July", "August", "September", "October", "November", "December",
+    )
+
+    _FLAG_CHARS = frozenset(string.ascii_letters + "_")
+
+    # Flags that suppress the auto-applied engineering standards
+    _HELP_FLAGS = frozenset({"hh", "hhelp"})
+    _STANDARDS_FLAGS = frozenset({"e", "eng", "standards"})
+
+    # Patterns compiled once per process
+    _SKIP_RE = re.compile(
+        r"^(?:(?:ls|dir|pwd|cd|cat|grep|find|which|what|where|who|when|how much|how many)\b"
+        r"|(?:show|list|display|get|fetch)\s+"
+        r"|\?"
+        r"|(?:hi|hello|hey|thanks|thank you|bye))"
+    )
+
     class PromptEnhancer:
         def __init__(self) -> None:
             self.contexts: List[str] = []
+            self.now: datetime = datetime.now()
             self.log_data: Dict[str, Any] = {
-                "timestamp": datetime.now().isoformat(),
-                "formatted_date": datetime.now().strftime("%B {}, %Y").format(datetime.now().day),
+                "timestamp": self.now.isoformat(),
+                "formatted_date": f"{_MONTHS[self.now.month - 1]} {self.now.day}, {self.now.year}",
             }
 
         def add_context(self, context: str) -> None:
-            if context and context.strip():
-                self.contexts.append(context.strip())
+            if not context:
+                return
+            context = context.strip()
+            if context:
+                self.contexts.append(context)
 
         def log_event(self, key: str, value: Any) -> None:
             self.log_data[key] = value
 
     def parse_flags(prompt: str) -> Tuple[str, List[str]]:
-        flags_pattern = r"((?:^|\s+)-[a-zA-Z_]+)+$"
-        match = re.search(flags_pattern, prompt)
-        if match:
-            flags_str = match.group(0)
-            clean_prompt = prompt[: match.start()].rstrip()
-            flags = re.findall(r"-([a-zA-Z_]+)", flags_str)
-            return clean_prompt, flags
+        flags: List[str] = []
+        rest = prompt.rstrip()
+        while rest:
+            parts = rest.rsplit(None, 1)
+            token = parts[-1]
+            if len(token) < 2 or token[0] != "-" or not _FLAG_CHARS.issuperset(token[1:]):
+                break
+            flags.append(token[1:])
+            rest = parts[0] if len(parts) == 2 else ""
+        if flags:
+            flags.reverse()
+            return rest, flags
         return prompt, []
 
     def should_apply_defaults(prompt: str, flags: List[str]) -> bool:
-        skip_patterns = [
-            r"^(ls|dir|pwd|cd|cat|grep|find|which|what|where|who|when|how much|how many)\b",
-            r"^(show|list|display|get|fetch)\s+(me\s+)?(the\s+)?",
-            r"^\?", r"^(hi|hello|hey|thanks|thank you|bye)",
-        ]
-        prompt_lower = prompt.lower()
-        for pattern in skip_patterns:
-            if re.match(pattern, prompt_lower):
-                return False
-        return True
+        return _SKIP_RE.match(prompt[:32].lower()) is None
 
-    def write_log(enhancer: PromptEnhancer) -> None:
-        if not ENABLE_LOGGING:
+    _LOG_BUFFER: List[bytes] = []
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    def _flush_logs() -> None:
+        if not _LOG_BUFFER:
             return
         try:
             LOG_DIR.mkdir(parents=True, exist_ok=True)
             log_file = LOG_DIR / "prompt_hooks.jsonl"
-            with open(log_file, "a") as f:
-                json.dump(enhancer.log_data, f)
-                f.write("\n")
+            with open(log_file, "ab") as f:
+                f.write(b"".join(_LOG_BUFFER))
         except (IOError, OSError, PermissionError):
             pass
+        finally:
+            _LOG_BUFFER.clear()
+
+    atexit.register(_flush_logs)
+
+    def write_log(enhancer: PromptEnhancer) -> None:
+        if not ENABLE_LOGGING:
+            return
+        try:
+            _LOG_BUFFER.append(_dumps(enhancer.log_data) + b"\n")
+        except (TypeError, ValueError):
+            pass
+
+    def get_git_branch() -> str:
+        try:
+            cwd = Path.cwd()
+            for directory in (cwd, *cwd.parents):
+                git_path = directory / ".git"
+                if git_path.is_dir():
+                    head = (git_path / "HEAD").read_text().strip()
+                    if head == "ref: refs/heads/.invalid":
+                        break  # Reftable stub HEAD: let git resolve it
+                    # Detached HEAD has no branch, same as `git branch --show-current`
+                    return head[16:] if head.startswith("ref: refs/heads/") else ""
+                if git_path.is_file():
+                    break  # Worktree or submodule: let git resolve HEAD
+            else:
+                return ""
+        except OSError:
+            return ""
+
+        import subprocess  # Imported lazily; only needed here
+
+        try:
+            with subprocess.Popen(
+                ["git", "branch", "--show-current"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            ) as proc:
+                return proc.stdout.read(256).decode().strip()
+        except (FileNotFoundError, OSError):
+            return ""
 
 def main() -> None:
     try:
-        input_data = json.load(sys.stdin)
+        input_data = json.loads(sys.stdin.buffer.read())
         prompt: str = input_data.get("prompt", "")
         session_id: str = input_data.get("session_id", "unknown")
 
@@ -306,32 +399,35 @@ def main() -> None:
         enhancer.log_event("session_id", session_id)
         enhancer.log_event("hook_version", "enhanced")
 
+        if not prompt.strip():
+            enhancer.log_event("empty_prompt", True)
+            write_log(enhancer)
+            sys.exit(0)
+
         clean_prompt, flags = parse_flags(prompt)
         enhancer.log_event("flags", flags)
         enhancer.log_event("clean_prompt", clean_prompt)
+        flags_set = {flag.lower() for flag in flags}
+        is_help = not flags_set.isdisjoint(_HELP_FLAGS)
 
-        if clean_prompt.strip() == "" and ("hh" in flags or "hhelp" in flags):
+        if clean_prompt.strip() == "" and is_help:
             clean_prompt = "Show available hook flags"
             enhancer.log_event("help_request", True)
 
         # Add current date context
-        current_date = f"\n[Current Date: {datetime.now().strftime('%B %d, %Y')}]"
+        now = enhancer.now
+        current_date = f"\n[Current Date: {_MONTHS[now.month - 1]} {now.day:02d}, {now.year}]"
         enhancer.add_context(current_date)
 
         # Add git branch if available
-        try:
-            branch = subprocess.check_output(
-                ["git", "branch", "--show-current"], stderr=subprocess.DEVNULL
-            ).decode().strip()
-            if branch:
-                enhancer.add_context(f"\n[Git Branch: {branch}]")
-        except (subprocess.CalledProcessError, FileNotFoundError, OSError):
-            pass
+        branch = get_git_branch()
+        if branch:
+            enhancer.add_context(f"\n[Git Branch: {branch}]")
 
         # Apply default engineering standards
-        if "hh" not in flags and "hhelp" not in flags:
-            if (should_apply_defaults(clean_prompt, flags) 
-                and "e" not in flags and "eng" not in flags):
+        if not is_help:
+            if (should_apply_defaults(clean_prompt, flags)
+                and flags_set.isdisjoint(_STANDARDS_FLAGS)):
                 enhancer.add_context(EnhancedFlagHandlers.engineering_standards())
                 enhancer.log_event("auto_applied_enhanced_standards", True)
 
@@ -347,7 +443,8 @@ def main() -> None:
 
         # Output combined context
         if enhancer.contexts:
-            output: str = "\n".join(enhancer.contexts)
+            contexts = enhancer.contexts
+            output: str = contexts[0] if len(contexts) == 1 else "\n".join(contexts)
             print(output)
             enhancer.log_event("injected_context", output)
 
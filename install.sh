@@ -26,7 +26,7 @@ mkdir -p "$CLAUDE_DIR/commands"
 # Function to copy hook files
 copy_hooks() {
     echo "Copying hook files..."
-    cp "$SCRIPT_DIR/hooks/UserPromptSubmit/ultimate-prompt-hook.py" "$CLAUDE_DIR/hooks/UserPromptSubmit/"
+    cp "$SCRIPT_DIR/hooks/UserPromptSubmit/ultimate_prompt_hook.py" "$CLAUDE_DIR/hooks/UserPromptSubmit/"
     cp "$SCRIPT_DIR/hooks/UserPromptSubmit/ultimate-prompt-hook-enhanced.py" "$CLAUDE_DIR/hooks/UserPromptSubmit/"
     chmod +x "$CLAUDE_DIR/hooks/UserPromptSubmit/"*.py
 }